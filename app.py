@@ -3,13 +3,22 @@ from dotenv import load_dotenv
 from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-import pandas as pd
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, raiseload
+import csv
+from typing import NamedTuple
+from cachetools import TTLCache
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
+import re
+import sqlite3
+import threading
 from flask_migrate import Migrate
-from datetime import datetime
+from datetime import datetime, timezone
 from dateutil import parser
-from services.sentiment_analyzer import SentimentAnalyzer
+from services.sentiment_analyzer import SentimentAnalyzer, _get_session, _get_tokenizer
+from services import sentiment_worker
 
 load_dotenv()
 newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
@@ -25,14 +34,99 @@ if 'DATABASE_URL' in os.environ:
 else:
     # For local development
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
+# Pool sized for gevent workers: many greenlets share one process pool,
+# and pre-ping avoids handing out connections the server already closed
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 20,
+    'max_overflow': 40,
+    'pool_pre_ping': True,
+    'pool_recycle': 1800
+}
 # SQLite database
 db = SQLAlchemy(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'  # Redirect to login page for protected routes
 
 
-# Load CSV data
-summaries_df = pd.read_csv("summaries_with_sentiment.csv")
+class Summary(NamedTuple):
+    id: int
+    title: str
+    summary: str
+    sentiment: str
+    confidence: float
+
+
+def _load_summaries(path):
+    # Stdlib csv into slot-light tuples; no pandas import at startup
+    with open(path, newline='', encoding='utf-8') as f:
+        return [
+            Summary(
+                id=i,
+                title=row['title'],
+                summary=row['summary'],
+                sentiment=row['sentiment'],
+                confidence=float(row['confidence'] or 0.0)
+            )
+            for i, row in enumerate(csv.DictReader(f))
+        ]
+
+
+# Load CSV data once at import
+SUMMARIES = _load_summaries("summaries_with_sentiment.csv")
+
+
+def _build_fts_index(summaries):
+    # In-memory FTS5 index: search runs over an inverted index in C
+    # instead of a Python-level scan of every row
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.execute(
+        "CREATE VIRTUAL TABLE summaries USING fts5("
+        "title, summary, sentiment UNINDEXED, confidence UNINDEXED)"
+    )
+    conn.executemany(
+        "INSERT INTO summaries (rowid, title, summary, sentiment, confidence) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(s.id, s.title, s.summary, s.sentiment, s.confidence)
+         for s in summaries]
+    )
+    conn.commit()
+    return conn
+
+
+_fts_conn = _build_fts_index(SUMMARIES)
+_fts_lock = threading.Lock()
+
+
+# Casefold once at load so the fallback scan doesn't re-lower every row
+# on every request
+_SUMMARIES_CF = [(s, s.title.casefold(), s.summary.casefold())
+                 for s in SUMMARIES]
+
+
+def _search_summaries_contains(query):
+    # Substring scan over precomputed lowercased strings; fast enough
+    # for the <100k rows this CSV will ever hold
+    q = query.casefold()
+    return [s for s, title_cf, summary_cf in _SUMMARIES_CF
+            if q in title_cf or q in summary_cf]
+
+
+def search_summary_index(query):
+    # Phrase match with a trailing prefix; embedded quotes are doubled
+    match = '"{}" *'.format(query.replace('"', '""'))
+    try:
+        with _fts_lock:
+            rows = _fts_conn.execute(
+                "SELECT rowid, title, summary, sentiment, confidence "
+                "FROM summaries WHERE summaries MATCH ?", (match,)
+            ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    if not rows:
+        # FTS matches on token boundaries; fall back to a substring scan
+        # for mid-word queries it can't express
+        return _search_summaries_contains(query)
+    return [Summary(*row) for row in rows]
 
 # User model
 class User(UserMixin, db.Model):
@@ -41,6 +135,8 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(150), nullable=False)
 
+    comments = db.relationship('Comment', back_populates='user', lazy=True)
+
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -49,7 +145,7 @@ class Comment(db.Model):
     rating = db.Column(db.Integer, nullable=True)  # Optional
     timestamp = db.Column(db.DateTime, default=db.func.current_timestamp(), nullable=False)
 
-    user = db.relationship('User', backref=db.backref('comments', lazy=True))
+    user = db.relationship('User', back_populates='comments')
 
 
 # Add below the Comment model
@@ -68,13 +164,47 @@ class SavedArticle(db.Model):
 
     user = db.relationship('User', backref=db.backref('articles', lazy=True))
 
+    __table_args__ = (
+        # Matches the feed query: filter by user, newest first
+        db.Index('ix_saved_user_added', 'user_id', db.desc('added_at')),
+        db.UniqueConstraint('user_id', 'article_id', name='uq_saved_user_article'),
+    )
+
 migrate = Migrate(app, db)
 
+# Warm the sentiment model at startup so the first save doesn't pay the load
+with app.app_context():
+    _get_tokenizer()
+    _get_session()
+
+# Background worker that fills in sentiment for newly saved articles
+sentiment_worker.start_worker(app, db, SavedArticle)
+
+def _n_plus_one_guard():
+    # In debug, make any relationship access without an explicit eager load
+    # raise instead of silently issuing per-row SELECTs
+    return [raiseload('*')] if app.debug else []
+
+
+# NewsAPI timestamps are almost always this exact shape; match it with a
+# compiled regex and only fall back to dateutil's slower parser
+_ISO_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?Z$')
+
+
 def safe_parse_iso(date_str):
+    m = _ISO_RE.match(date_str or '')
     try:
+        if m:
+            # Pad/truncate the fractional part to microseconds so the fast
+            # path matches what dateutil would return; calendar-invalid
+            # matches (month 13, Feb 30) raise and hit the fallback below
+            fraction = m.group(7)
+            microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+            return datetime(*map(int, m.groups()[:6]),
+                            microsecond=microsecond, tzinfo=timezone.utc)
         return parser.isoparse(date_str)
-    except:
-        return datetime.now(datetime.timezone.utc)
+    except (ValueError, TypeError):
+        return datetime.now(timezone.utc)
 
 
 # Load user callback
@@ -86,8 +216,7 @@ def load_user(user_id):
 @app.route('/')
 @login_required
 def home():
-    data = summaries_df.to_dict(orient='records')
-    return render_template('index.html', data=data, username=current_user.username)
+    return render_template('index.html', data=SUMMARIES, username=current_user.username)
 
 # Search route to display filtered summaries
 @app.route('/search', methods=['GET'])
@@ -95,9 +224,7 @@ def home():
 def search_summaries():
     query = request.args.get('query')
     if query:
-        filtered_df = summaries_df[summaries_df['title'].str.contains(query, case=False) |
-                                   summaries_df['summary'].str.contains(query, case=False)]
-        data = filtered_df.to_dict(orient='records')
+        data = search_summary_index(query)
     else:
         data = []
     return render_template('search.html', data=data, query=query)
@@ -108,8 +235,9 @@ def register():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        # Corrected hashing method
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        # Pin iterations to the OWASP minimum for PBKDF2-SHA256; hashlib
+        # uses the SHA-NI accelerated OpenSSL primitive where available
+        hashed_password = generate_password_hash(password, method='pbkdf2:sha256:600000')
         new_user = User(username=username, password=hashed_password)
         db.session.add(new_user)
         db.session.commit()
@@ -147,11 +275,12 @@ def dashboard():
         return redirect(url_for('login'))
     
     username = current_user.username
-    summaries_df['id'] = summaries_df.index
-    data = summaries_df.to_dict(orient='records')  # Load summaries from the CSV
+    data = SUMMARIES  # Summaries are materialized once at import
     
-    # Load comments for each summary
-    comments = Comment.query.all()
+    # Load comments for each summary; joinedload pulls all users in the
+    # same query instead of one SELECT per comment
+    comments = Comment.query.options(joinedload(Comment.user), *_n_plus_one_guard()) \
+        .order_by(Comment.timestamp.desc()).all()
     comments_by_summary = {}
     for comment in comments:
         comments_by_summary.setdefault(comment.summary_id, []).append({
@@ -193,19 +322,35 @@ def add_comment(summary_id):
 # new routes to be added
 # Add these routes below existing ones
 
+# Short-TTL cache so popular queries skip the NewsAPI round trip
+_news_cache = TTLCache(maxsize=512, ttl=300)
+_news_cache_lock = threading.Lock()
+
+
+def fetch_news(query):
+    key = query.strip().lower()
+    with _news_cache_lock:
+        if key in _news_cache:
+            return _news_cache[key]
+    results = newsapi.get_everything(
+        q=query,
+        language='en',
+        sort_by='relevancy',
+        page_size=20
+    )
+    articles = results['articles']
+    with _news_cache_lock:
+        _news_cache[key] = articles
+    return articles
+
+
 @app.route('/news/search')
 @login_required
 def news_search():
     query = request.args.get('q', '')
     if query:
         try:
-            results = newsapi.get_everything(
-                q=query,
-                language='en',
-                sort_by='relevancy',
-                page_size=20
-            )
-            articles = results['articles']
+            articles = fetch_news(query)
         except Exception as e:
             flash('Error fetching news articles', 'danger')
             articles = []
@@ -217,11 +362,8 @@ def news_search():
 @app.route('/save_article', methods=['POST'])
 @login_required
 def save_article():
-    try:
-        # Parse published_at date
-        published_at = safe_parse_iso(request.form['published_at'])
-    except Exception as e:
-        published_at = datetime.now(datetime.timezone.utc)
+    # Parse published_at date
+    published_at = safe_parse_iso(request.form['published_at'])
 
     article_data = {
         'article_id': request.form['url'][-15:],
@@ -232,49 +374,127 @@ def save_article():
         'published_at': published_at
     }
 
-    # Analyze sentiment
+    # Sentiment is filled in asynchronously by the background worker so
+    # the response doesn't wait on model inference
+    article_data.update({
+        'sentiment': 'pending',
+        'confidence': 0.0
+    })
+
     try:
-        analyzer = SentimentAnalyzer()
-        text_to_analyze = f"{article_data['title']} {article_data['description']}"
-        sentiment = analyzer.analyze(text_to_analyze)
-        article_data.update({
-            'sentiment': sentiment.get('sentiment', 'neutral'),
-            'confidence': sentiment.get('confidence', 0.0)
-        })
+        # Single upsert: the (user_id, article_id) unique constraint does
+        # the dedup check atomically, saving the SELECT round-trip
+        insert_fn = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+        stmt = insert_fn(SavedArticle).values(
+            user_id=current_user.id,
+            **article_data
+        ).on_conflict_do_nothing(
+            index_elements=['user_id', 'article_id']
+        ).returning(SavedArticle.id)
+        inserted_id = db.session.execute(stmt).scalar()
+        db.session.commit()
+
+        if inserted_id is None:
+            return jsonify({
+                'success': False,
+                'message': 'Article already in your feed'
+            }), 409
+
+        sentiment_worker.enqueue(inserted_id)
+
+        return jsonify({
+            'success': True,
+            'message': 'Article saved to your feed!',
+            'sentiment': article_data['sentiment'],
+            'confidence': article_data['confidence'],
+            'article_id': article_data['article_id']
+        }), 202
+
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
-            'message': f'Sentiment analysis failed: {str(e)}'
+            'message': f'Database error: {str(e)}'
         }), 500
 
-    # Check for existing article
-    existing = SavedArticle.query.filter_by(
-        user_id=current_user.id,
-        article_id=article_data['article_id']
-    ).first()
+@app.route('/save_articles_bulk', methods=['POST'])
+@login_required
+def save_articles_bulk():
+    articles = request.get_json(silent=True)
+    if not isinstance(articles, list) or not articles:
+        return jsonify({'success': False, 'message': 'No articles provided'}), 400
+
+    prepared = []
+    seen_ids = set()
+    for article in articles:
+        # Skip malformed entries instead of failing the whole batch
+        if not isinstance(article, dict) or not article.get('url') or not article.get('title'):
+            continue
+        article_id = article['url'][-15:]
+        if article_id in seen_ids:
+            continue
+        seen_ids.add(article_id)
+        prepared.append({
+            'article_id': article_id,
+            'title': article['title'],
+            'description': article.get('description'),
+            'url': article['url'],
+            'source': article.get('source'),
+            'published_at': safe_parse_iso(article.get('published_at', ''))
+        })
+
+    if not prepared:
+        return jsonify({'success': False, 'message': 'No valid articles provided'}), 400
+
+    # Cheap prefilter so known duplicates don't waste inference; the
+    # upsert below still covers races with concurrent saves
+    existing_ids = {
+        row.article_id for row in SavedArticle.query.filter(
+            SavedArticle.user_id == current_user.id,
+            SavedArticle.article_id.in_([a['article_id'] for a in prepared])
+        ).all()
+    }
+    prepared = [a for a in prepared if a['article_id'] not in existing_ids]
 
-    if existing:
+    if not prepared:
         return jsonify({
             'success': False,
-            'message': 'Article already in your feed'
+            'message': 'All articles already in your feed'
         }), 409
 
+    # One batched forward pass instead of one inference per article
+    analyzer = SentimentAnalyzer()
+    texts = [' '.join(part for part in (a['title'], a['description']) if part)
+             for a in prepared]
+    for article_data, sentiment in zip(prepared, analyzer.analyze_batch(texts)):
+        article_data.update({
+            'sentiment': sentiment.get('sentiment', 'neutral'),
+            'confidence': sentiment.get('confidence', 0.0)
+        })
+
     try:
-        new_article = SavedArticle(
-            user_id=current_user.id,
-            **article_data
-        )
-        db.session.add(new_article)
+        # Multi-row upsert: conflicts with concurrent saves are dropped
+        # by the DB instead of failing the whole batch
+        insert_fn = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+        stmt = insert_fn(SavedArticle).values([
+            {'user_id': current_user.id, **article_data}
+            for article_data in prepared
+        ]).on_conflict_do_nothing(index_elements=['user_id', 'article_id'])
+        saved = db.session.execute(stmt).rowcount
         db.session.commit()
-        
+
+        if not saved:
+            return jsonify({
+                'success': False,
+                'message': 'All articles already in your feed'
+            }), 409
+
         return jsonify({
             'success': True,
-            'message': 'Article saved to your feed!',
-            'sentiment': new_article.sentiment,
-            'confidence': new_article.confidence,
-            'article_id': new_article.article_id
+            'message': f'{saved} articles saved to your feed!',
+            'saved': saved
         })
-        
+
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -286,19 +506,30 @@ def save_article():
 @login_required
 def personal_feed():
     search_query = request.args.get('search', '')
-    base_query = SavedArticle.query.filter_by(user_id=current_user.id)
-    
+    page = request.args.get('page', 1, type=int)
+    base_query = SavedArticle.query.options(*_n_plus_one_guard()) \
+        .filter_by(user_id=current_user.id)
+
     if search_query:
-        # Search in title or description
-        articles = base_query.filter(
-            (SavedArticle.title.ilike(f'%{search_query}%')) | 
-            (SavedArticle.description.ilike(f'%{search_query}%'))
-        ).order_by(SavedArticle.added_at.desc()).all()
-    else:
-        articles = base_query.order_by(SavedArticle.added_at.desc()).all()
-    
-    return render_template('personal_feed.html', 
-                         articles=articles,
+        if db.engine.dialect.name == 'postgresql':
+            # Indexed full-text match on the generated search_tsv column
+            base_query = base_query.filter(
+                db.text("search_tsv @@ plainto_tsquery('english', :q)")
+            ).params(q=search_query)
+        else:
+            # SQLite dev fallback: substring search in title or description
+            base_query = base_query.filter(
+                (SavedArticle.title.ilike(f'%{search_query}%')) |
+                (SavedArticle.description.ilike(f'%{search_query}%'))
+            )
+
+    # Page the feed instead of loading every saved article into memory
+    pagination = base_query.order_by(SavedArticle.added_at.desc()) \
+        .paginate(page=page, per_page=25, error_out=False)
+
+    return render_template('personal_feed.html',
+                         articles=pagination.items,
+                         pagination=pagination,
                          search_query=search_query)
 
 # Run the application
@@ -0,0 +1,29 @@
+"""Add saved_article feed index and per-user dedup constraint
+
+Revision ID: 3c91d2a60b47
+Revises: 7fb44f0fc4a5
+Create Date: 2026-08-26 11:02:14.518243
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c91d2a60b47'
+down_revision = '7fb44f0fc4a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # batch mode so the unique constraint also applies on SQLite
+    with op.batch_alter_table('saved_article', schema=None) as batch_op:
+        batch_op.create_index('ix_saved_user_added', ['user_id', sa.text('added_at DESC')], unique=False)
+        batch_op.create_unique_constraint('uq_saved_user_article', ['user_id', 'article_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('saved_article', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_saved_user_article', type_='unique')
+        batch_op.drop_index('ix_saved_user_added')
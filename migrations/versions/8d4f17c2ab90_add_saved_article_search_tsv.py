@@ -0,0 +1,36 @@
+"""Add generated tsvector column and GIN index for feed search
+
+Revision ID: 8d4f17c2ab90
+Revises: 3c91d2a60b47
+Create Date: 2026-08-26 11:19:47.902611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f17c2ab90'
+down_revision = '3c91d2a60b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres-only: SQLite dev installs keep using LIKE
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "ALTER TABLE saved_article ADD COLUMN search_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', "
+        "coalesce(title,'') || ' ' || coalesce(description,''))) STORED"
+    )
+    op.create_index('ix_saved_tsv', 'saved_article', ['search_tsv'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_saved_tsv', table_name='saved_article')
+    op.execute("ALTER TABLE saved_article DROP COLUMN search_tsv")
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+
+try:
+    from gevent import monkey as _monkey
+except ImportError:
+    _monkey = None
+
+from services.sentiment_analyzer import SentimentAnalyzer
+
+_BATCH_MAX = 32
+
+
+def _original(module, name, default):
+    # Under the gevent gunicorn worker a patched "thread" is a greenlet,
+    # and blocking inference in it would stall every request in the
+    # process; fetch the pre-patch originals so the worker runs on a
+    # real OS thread
+    if _monkey is not None and _monkey.is_module_patched(module):
+        return _monkey.get_original(module, name)
+    return default
+
+
+_Thread = _original('threading', 'Thread', threading.Thread)
+_sleep = _original('time', 'sleep', time.sleep)
+
+
+def _make_queue():
+    # queue.Queue builds on whatever threading exposes at call time; the
+    # gevent-patched primitives can't be waited on from a real OS thread,
+    # so swap in original locks/conditions when patched
+    q = queue.Queue()
+    if _monkey is not None and _monkey.is_module_patched('threading'):
+        lock = _monkey.get_original('threading', 'Lock')()
+        condition = _monkey.get_original('threading', 'Condition')
+        q.mutex = lock
+        q.not_empty = condition(lock)
+        q.not_full = condition(lock)
+        q.all_tasks_done = condition(lock)
+    return q
+
+
+_queue = _make_queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _drain_batch():
+    # Block until one id arrives, then greedily take whatever else is
+    # pending so bursts get classified in a single forward pass
+    ids = [_queue.get()]
+    while len(ids) < _BATCH_MAX:
+        try:
+            ids.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return ids
+
+
+def _run(app, db, model):
+    analyzer = SentimentAnalyzer()
+    while True:
+        ids = _drain_batch()
+        with app.app_context():
+            try:
+                articles = model.query.filter(model.id.in_(ids)).all()
+                if not articles:
+                    continue
+                texts = [f"{a.title} {a.description}" for a in articles]
+                for article, result in zip(articles, analyzer.analyze_batch(texts)):
+                    article.sentiment = result.get('sentiment', 'neutral')
+                    article.confidence = result.get('confidence', 0.0)
+                db.session.commit()
+            except Exception as e:
+                # A transient DB error (stale connection, busy SQLite)
+                # must not kill the thread: roll back, put the batch
+                # back on the queue and retry after a pause
+                db.session.rollback()
+                for article_id in ids:
+                    _queue.put(article_id)
+                _sleep(5)
+
+
+def start_worker(app, db, model):
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            # The queue lives in process memory, so re-enqueue rows a
+            # previous process left pending before it exited
+            try:
+                with app.app_context():
+                    pending = model.query.filter_by(sentiment='pending') \
+                        .with_entities(model.id).all()
+                    for (article_id,) in pending:
+                        _queue.put(article_id)
+            except Exception as e:
+                # First boot can run before migrations create the table;
+                # those rows get picked up on the next restart
+                pass
+            _worker = _Thread(
+                target=_run, args=(app, db, model),
+                daemon=True, name='sentiment-worker'
+            )
+            _worker.start()
+
+
+def enqueue(article_id):
+    _queue.put(article_id)